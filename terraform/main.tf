@@ -91,7 +91,7 @@ resource "juju_integration" "gnbsim-nms" {
 
 module "cos" {
   source                   = "git::https://github.com/canonical/terraform-juju-sdcore//modules/external/cos-lite"
-  model_name               = "cos-lite"
+  model_name               = var.cos_model_name
   deploy_cos_configuration = true
   cos_configuration_config = {
     git_repo                = "https://github.com/canonical/sdcore-cos-configuration"
@@ -12,3 +12,9 @@ variable "ran_model_name" {
   type        = string
   default     = "ran"
 }
+
+variable "cos_model_name" {
+  description = "Name of Juju model to deploy COS Lite to."
+  type        = string
+  default     = "cos-lite"
+}
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# Copyright 2025 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+import os
+
+import pytest
+
+from tests.integration.metrics_helper import (
+    export_chrome_trace,
+    export_openmetrics,
+    get_spans,
+    log_slowest_spans,
+    span,
+)
+from tests.integration.parallel_helper import get_namespace_suffix
+from tests.integration.retry_helper import get_retry_stats, log_retry_stats
+
+METRICS_DIR = os.getenv("SDCORE_TESTS_METRICS_DIR", "metrics")
+GROUPING_DIST_MODES = ("no", "loadgroup", "loadscope", "loadfile")
+
+
+def pytest_configure(config):
+    """Refuse pytest-xdist modes which would split tests sharing a deployment between workers.
+
+    Every worker deploys its own namespaced models, so a test sent to a worker which didn't run
+    the deployment test would run against models which were never deployed.
+    """
+    dist = getattr(config.option, "dist", "no")
+    if dist not in GROUPING_DIST_MODES:
+        raise pytest.UsageError(
+            f"`--dist {dist}` splits tests sharing a deployment between workers. "
+            f"Use one of: {', '.join(GROUPING_DIST_MODES)}."
+        )
+
+
+@pytest.hookimpl(hookwrapper=True, tryfirst=True)
+def pytest_runtest_makereport(item, call):
+    """Expose reports of test phases to fixtures as `item.rep_setup` and `item.rep_call`."""
+    outcome = yield
+    report = outcome.get_result()
+    setattr(item, f"rep_{report.when}", report)
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_setup(item):
+    """Time the setup of every test, including class setup and fixtures."""
+    with span(f"{item.name} setup", category="pytest"):
+        yield
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item):
+    """Time the body of every test."""
+    with span(item.name, category="pytest"):
+        yield
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_teardown(item):
+    """Time the teardown of every test, including class teardown and fixtures."""
+    with span(f"{item.name} teardown", category="pytest"):
+        yield
+
+
+def pytest_sessionfinish(session, exitstatus):
+    """Log and export how time was spent in the session.
+
+    When tests are distributed with pytest-xdist, each worker exports its own files, while the
+    controller and idle workers, which run no tests, export nothing.
+    """
+    if _is_xdist_controller(session.config) or not get_spans():
+        return
+    log_retry_stats()
+    log_slowest_spans()
+    file_name = f"sdcore-tests{get_namespace_suffix()}"
+    export_openmetrics(os.path.join(METRICS_DIR, f"{file_name}.om.txt"), get_retry_stats())
+    export_chrome_trace(os.path.join(METRICS_DIR, f"{file_name}.trace.json"))
+
+
+def _is_xdist_controller(config) -> bool:
+    """Return whether this process distributes tests to pytest-xdist workers."""
+    return not hasattr(config, "workerinput") and bool(getattr(config.option, "tx", None))
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# Copyright 2025 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""Module used to collect diagnostics of a failed deployment."""
+
+import logging
+import os
+import shutil
+import signal
+import tarfile
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from subprocess import PIPE, STDOUT, Popen
+from typing import Callable, Generator, Iterable, Iterator, List, Tuple
+
+from tests.integration import juju_helper, k8s_helper
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIME_BUDGET = 300
+DEFAULT_MAX_SOURCE_SIZE = 50 * 1024 * 1024
+MAX_WORKERS = 8
+CHUNK_SIZE = 64 * 1024
+TRUNCATED_MARKER = b"\n[truncated: size limit or time budget exceeded]\n"
+
+# Callable taking the collection deadline and returning chunks of diagnostics output
+Source = Callable[[float], Generator[bytes, None, None]]
+
+
+def collect_diagnostics(
+    model_names: Iterable[str],
+    archive_path: str,
+    time_budget: int = DEFAULT_TIME_BUDGET,
+    max_source_size: int = DEFAULT_MAX_SOURCE_SIZE,
+) -> str:
+    """Collect diagnostics of given Juju models into a single compressed archive.
+
+    Diagnostics include `juju status`, `juju debug-log`, `juju show-unit` of units which are not
+    Active-Idle and logs of all pods in the Kubernetes namespaces of the models. All sources are
+    commands streamed concurrently. Each of them is truncated once it exceeds `max_source_size`
+    bytes and killed when `time_budget` runs out, so a broken deployment can't stall the
+    collection. The archive is created once all sources have finished.
+
+    Args:
+        model_names(Iterable[str]): Juju model names
+        archive_path(str): Path of the `.tar.gz` archive to create
+        time_budget(int): Time in seconds after which collection is stopped
+        max_source_size(int): Maximum number of bytes collected from a single source
+
+    Returns:
+        str: Path of the created archive
+    """
+    deadline = time.monotonic() + time_budget
+    staging_dir = tempfile.mkdtemp(prefix="sdcore-diagnostics-")
+    futures: List[Future] = []
+    try:
+        # Leaving the executor waits for all sources, which are killed at the deadline
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            for name, source in _get_sources(list(model_names), max_source_size):
+                futures.append(
+                    executor.submit(
+                        _run_source,
+                        source,
+                        os.path.join(staging_dir, name),
+                        deadline,
+                        max_source_size,
+                    )
+                )
+        for future in futures:
+            if future.exception():
+                logger.warning("Failed to collect diagnostics: %s", future.exception())
+        os.makedirs(os.path.dirname(os.path.abspath(archive_path)), exist_ok=True)
+        archive_name = os.path.basename(archive_path).removesuffix(".tar.gz")
+        with tarfile.open(archive_path, mode="w:gz") as archive:
+            archive.add(staging_dir, arcname=archive_name)
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+    logger.info("Diagnostics collected in %s", archive_path)
+    return archive_path
+
+
+def _get_sources(model_names: List[str], max_source_size: int) -> Iterator[Tuple[str, Source]]:
+    """Yield diagnostics sources of given Juju models.
+
+    Args:
+        model_names(List[str]): Juju model names
+        max_source_size(int): Maximum number of bytes of a pod log to fetch
+
+    Listing sources is best effort. When listing units or pods of a model fails, only these
+    sources are skipped, so whatever else can be collected still ends up in the archive.
+
+    Yields:
+        tuple: Relative path of the output file and the source of its content
+    """
+    kubectl_available = shutil.which("kubectl") is not None
+    if not kubectl_available:
+        logger.warning("kubectl not found. Skipping pod logs.")
+    for model_name in model_names:
+        try:
+            model_exists = juju_helper.model_exists(model_name)
+        except Exception as e:
+            # Juju commands below report the actual error in their output
+            logger.warning("Failed to check whether Juju model %s exists: %s", model_name, e)
+            model_exists = True
+        if not model_exists:
+            logger.warning("Juju model %s does not exist. Skipping diagnostics.", model_name)
+            continue
+        yield (
+            f"{model_name}/juju-status.txt",
+            _command_source(["juju", "status", "-m", model_name, "--relations"]),
+        )
+        yield (
+            f"{model_name}/juju-debug-log.txt",
+            _command_source(
+                ["juju", "debug-log", "-m", model_name, "--replay", "--no-tail", "--level=DEBUG"]
+            ),
+        )
+        try:
+            not_ready_units = juju_helper.get_not_ready_units(model_name)
+        except Exception as e:
+            logger.warning("Failed to get status of %s: %s", model_name, e)
+            not_ready_units = {}
+        for unit_name in not_ready_units:
+            yield (
+                f"{model_name}/show-unit-{unit_name.replace('/', '-')}.yaml",
+                _command_source(["juju", "show-unit", "-m", model_name, unit_name]),
+            )
+        if not kubectl_available:
+            continue
+        try:
+            pod_containers = k8s_helper.get_pod_containers(namespace=model_name)
+        except Exception as e:
+            logger.warning("Failed to list pods of %s: %s", model_name, e)
+            pod_containers = []
+        for pod_name, container_name in pod_containers:
+            yield (
+                f"{model_name}/pods/{pod_name}-{container_name}.log",
+                _command_source(
+                    [
+                        "kubectl",
+                        "logs",
+                        "-n",
+                        model_name,
+                        pod_name,
+                        "-c",
+                        container_name,
+                        f"--limit-bytes={max_source_size}",
+                    ]
+                ),
+            )
+
+
+def _command_source(cmd: List[str]) -> Source:
+    """Return a diagnostics source streaming the output of a command."""
+
+    def source(deadline: float) -> Generator[bytes, None, None]:
+        with Popen(cmd, stdout=PIPE, stderr=STDOUT, start_new_session=True) as process:
+            # Killing the process unblocks reading from a command which stopped producing output
+            timer = threading.Timer(max(deadline - time.monotonic(), 0), _kill, [process])
+            timer.start()
+            try:
+                while chunk := process.stdout.read1(CHUNK_SIZE):  # type: ignore[union-attr]
+                    yield chunk
+            finally:
+                timer.cancel()
+                _kill(process)
+
+    return source
+
+
+def _kill(process: Popen) -> None:
+    """Kill a command together with the children which could keep its output open."""
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def _run_source(source: Source, output_path: str, deadline: float, max_size: int):
+    """Write output of a diagnostics source to a file, respecting size and time limits.
+
+    Args:
+        source(Source): Diagnostics source
+        output_path(str): Path of the output file
+        deadline(float): `time.monotonic()` value after which the collection is stopped
+        max_size(int): Maximum number of bytes to write
+    """
+    if time.monotonic() > deadline:
+        logger.warning("Time budget exceeded. Skipping %s", output_path)
+        return
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    chunks = source(deadline)
+    written = 0
+    try:
+        with open(output_path, mode="wb") as output:
+            for chunk in chunks:
+                if written + len(chunk) > max_size or time.monotonic() > deadline:
+                    output.write(chunk[: max(max_size - written, 0)])
+                    output.write(TRUNCATED_MARKER)
+                    break
+                output.write(chunk)
+                written += len(chunk)
+            else:
+                if time.monotonic() > deadline:
+                    # The command was killed at the deadline
+                    output.write(TRUNCATED_MARKER)
+    finally:
+        chunks.close()
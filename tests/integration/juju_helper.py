@@ -5,12 +5,18 @@
 import json
 import logging
 import time
-from contextlib import contextmanager
 from subprocess import CalledProcessError, call, check_output
-from typing import Optional, Tuple
+from typing import Dict, List, Optional, Set, Tuple
+
+from tests.integration.metrics_helper import span
+from tests.integration.retry_helper import RetryPolicy, wait_until
+from tests.integration.status_helper import StatusSnapshot, UnitStatus
 
 logger = logging.getLogger(__name__)
 
+# Units which are not expected to become Active-Idle
+IGNORED_UNITS = ("traefik",)
+
 
 def create_model(model_name: str):
     """Create a Juju model.
@@ -20,45 +26,197 @@ def create_model(model_name: str):
     """
     create_model_cmd = ["juju", "add-model", model_name]
     try:
-        check_output(create_model_cmd)
+        with span(f"juju add-model {model_name}", category="juju"):
+            check_output(create_model_cmd)
     except CalledProcessError as e:
         raise JujuError(f"Failed to create Juju model: {model_name}") from e
 
 
-def juju_wait_for_active_idle(model_name: str, timeout: int, time_idle: int = 10):
+def destroy_model(model_name: str):
+    """Destroy a Juju model together with its storage.
+
+    Args:
+        model_name(str): Juju model name
+
+    Raises:
+        JujuError: Custom error raised when destroying the model fails
+    """
+    destroy_model_cmd = [
+        "juju",
+        "destroy-model",
+        model_name,
+        "--force",
+        "--destroy-storage",
+        "--no-prompt",
+    ]
+    try:
+        with span(f"juju destroy-model {model_name}", category="juju"):
+            check_output(destroy_model_cmd)
+    except CalledProcessError as e:
+        raise JujuError(f"Failed to destroy Juju model: {model_name}") from e
+
+
+def get_model_uuid(model_name: str) -> Optional[str]:
+    """Get the UUID of a Juju model.
+
+    Args:
+        model_name(str): Juju model name
+
+    Returns:
+        str: Juju model UUID or None if the model does not exist
+    """
+    cmd_out = check_output(["juju", "models", "--format=json"]).decode()
+    for model in json.loads(cmd_out).get("models", []):
+        if model.get("short-name") == model_name:
+            return model.get("model-uuid")
+    return None
+
+
+def model_exists(model_name: str) -> bool:
+    """Check whether a Juju model exists.
+
+    Args:
+        model_name(str): Juju model name
+
+    Returns:
+        bool: Whether the model exists
+    """
+    return get_model_uuid(model_name) is not None
+
+
+def juju_model_is_active_idle(
+    model_name: str, application_names: Optional[List[str]] = None
+) -> bool:
+    """Check whether applications in a given model are Active-Idle, without waiting.
+
+    Args:
+        model_name(str): Juju model name
+        application_names(List[str]): Juju application names. If not specified, all
+            applications in the model are checked
+
+    Returns:
+        bool: Whether the applications are Active-Idle
+    """
+    return not get_not_ready_units(model_name, application_names)
+
+
+def juju_wait_for_active_idle(
+    model_name: str,
+    timeout: int,
+    time_idle: int = 10,
+    application_names: Optional[List[str]] = None,
+):
     """Wait for all application in a given model to be become Active-Idle.
 
+    Only units whose status changed since the previous poll are logged.
+
     Args:
         model_name(str): Juju model name
         timeout(int): Time to wait for the applications to become Active-Idle
         time_idle(int): Time to wait after applications become Active-Idle
+        application_names(List[str]): Juju application names. If not specified, all
+            applications in the model are waited for
 
     Raises:
         TimeoutError: Raised if applications do not become Active-Idle within given time
     """
-    now = time.time()
-    with juju_context(model_name):
-        while time.time() - now <= timeout:
-            not_ready = {}
-            for _, app_status in juju_status().items():
-                for app_unit, unit_status in app_status["units"].items():
-                    if "traefik" not in app_unit:
-                        workload_status = unit_status["workload-status"]["current"]
-                        unit_juju_status = unit_status["juju-status"]["current"]
-                        if workload_status != "active" or unit_juju_status != "idle":
-                            not_ready[app_unit] = (workload_status, unit_juju_status)
-            if not_ready:
-                for unit, status in not_ready.items():
-                    logger.info(f"Waiting for {unit}. Current status is: {status}")
-                logger.info("Sleeping for 10 seconds...")
-                time.sleep(10)
+    not_ready: Dict[str, UnitStatus] = {}
+    previous: Optional[StatusSnapshot] = None
+    missing_applications: Set[str] = set()
+
+    def is_active_idle() -> bool:
+        nonlocal previous, missing_applications
+        snapshot = get_status_snapshot(model_name, application_names)
+        missing = _get_applications_without_units(snapshot, application_names)
+        if missing != missing_applications:
+            missing_applications = missing
+            for application_name in sorted(missing):
+                logger.info(f"Waiting for units of {application_name} to be deployed.")
+        changes = snapshot.diff(previous)
+        previous = snapshot
+        for unit_name in changes.removed:
+            not_ready.pop(unit_name, None)
+        for unit_name, unit in changes.changed.items():
+            if unit.is_ready or _is_ignored(unit_name):
+                if not_ready.pop(unit_name, None):
+                    logger.info(f"{unit_name} is ready.")
                 continue
-            time.sleep(time_idle)
-            logger.info("Deployment is ready!")
-            logger.info(check_output(["juju", "status"]).decode())
-            return
-        logger.info(check_output(["juju", "status"]).decode())
-        raise TimeoutError("Timed out waiting for Juju model to be ready!")
+            not_ready[unit_name] = unit
+            logger.info(f"Waiting for {unit_name}. Current status is: {unit.state}")
+        return not not_ready and not missing_applications
+
+    try:
+        wait_until(
+            is_active_idle,
+            name=f"Juju model {model_name} to be ready",
+            timeout=timeout,
+            policy=RetryPolicy(
+                initial_delay=5, max_delay=20, retryable=(CalledProcessError, ValueError)
+            ),
+        )
+    except TimeoutError:
+        logger.info(check_output(["juju", "status", "-m", model_name]).decode())
+        raise
+    with span(f"Juju model {model_name} to stay idle", category="sleep"):
+        time.sleep(time_idle)
+    logger.info("Deployment is ready!")
+    logger.info(check_output(["juju", "status", "-m", model_name]).decode())
+
+
+def get_not_ready_units(
+    model_name: str, application_names: Optional[List[str]] = None
+) -> Dict[str, Tuple[str, str]]:
+    """Return units of a given model which are not Active-Idle.
+
+    Args:
+        model_name(str): Juju model name
+        application_names(List[str]): Juju application names. If not specified, units of all
+            applications in the model are returned. Applications which are not deployed yet or
+            have no units yet are returned as not ready
+
+    Returns:
+        dict: Workload and Juju statuses of not ready units keyed by the unit name
+    """
+    snapshot = get_status_snapshot(model_name, application_names)
+    not_ready: Dict[str, Tuple[str, str]] = dict.fromkeys(
+        _get_applications_without_units(snapshot, application_names), ("unknown", "unknown")
+    )
+    for unit_name, unit in snapshot.not_ready_units(ignored=IGNORED_UNITS).items():
+        not_ready[unit_name] = unit.state
+    return not_ready
+
+
+def get_status_snapshot(
+    model_name: str, application_names: Optional[List[str]] = None
+) -> StatusSnapshot:
+    """Return status of units in a given model.
+
+    Args:
+        model_name(str): Juju model name
+        application_names(List[str]): Juju application names. If specified, only status of
+            these applications is queried
+
+    Returns:
+        StatusSnapshot: Status of the units
+    """
+    status = juju_status(model_name, *(application_names or []))
+    if application_names:
+        status = {name: status[name] for name in application_names if name in status}
+    return StatusSnapshot.from_json(status)
+
+
+def _get_applications_without_units(
+    snapshot: StatusSnapshot, application_names: Optional[List[str]]
+) -> Set[str]:
+    """Return requested applications which are not deployed yet or have no units yet."""
+    requested = set(application_names or [])
+    deployed = set(snapshot.applications) - set(snapshot.applications_without_units())
+    return requested - deployed
+
+
+def _is_ignored(unit_name: str) -> bool:
+    """Return whether a unit is not expected to become Active-Idle."""
+    return any(pattern in unit_name for pattern in IGNORED_UNITS)
 
 
 def get_unit_address(model_name: str, application_name: str, unit_number: int) -> str:
@@ -75,13 +233,15 @@ def get_unit_address(model_name: str, application_name: str, unit_number: int) -
     Raises:
         JujuError: Custom error raised when getting unit address fails
     """
-    with juju_context(model_name):
-        unit_name = f"{application_name}/{unit_number}"
-        status = juju_status(unit_name)
-        try:
-            return status[application_name]["units"][unit_name].get("address")
-        except KeyError as e:
-            raise JujuError(f"Failed to get IP address of {unit_name}!") from e
+    unit_name = f"{application_name}/{unit_number}"
+    snapshot = StatusSnapshot.from_json(juju_status(model_name, unit_name))
+    try:
+        address = snapshot.units[unit_name].address
+    except KeyError as e:
+        raise JujuError(f"Failed to get IP address of {unit_name}!") from e
+    if address is None:
+        raise JujuError(f"{unit_name} has no IP address!")
+    return address
 
 
 def juju_run_action(
@@ -102,29 +262,81 @@ def juju_run_action(
     Raises:
         JujuError: Custom error raised when running Juju action fails
     """
-    with juju_context(model_name):
-        unit_name = f"{application_name}/{unit_number}"
-        try:
+    unit_name = f"{application_name}/{unit_number}"
+    try:
+        with span(f"juju run {action_name}", category="juju", unit=unit_name):
             cmd_out = check_output(
-                ["juju", "run", unit_name, action_name, f"--wait={timeout}s", "--format=json"]
+                [
+                    "juju",
+                    "run",
+                    "-m",
+                    model_name,
+                    unit_name,
+                    action_name,
+                    f"--wait={timeout}s",
+                    "--format=json",
+                ]
             ).decode()
-            return json.loads(cmd_out)[unit_name]["results"]
-        except (CalledProcessError, KeyError) as e:
-            raise JujuError(f"Failed to run {action_name} action on {unit_name}!") from e
+        return json.loads(cmd_out)[unit_name]["results"]
+    except (CalledProcessError, KeyError) as e:
+        raise JujuError(f"Failed to run {action_name} action on {unit_name}!") from e
 
 
-def juju_status(app_or_unit_name: Optional[str] = None) -> dict:
-    """Return status of the model, application or unit.
+def juju_exec_in_container(
+    model_name: str,
+    application_name: str,
+    unit_number: int,
+    container_name: str,
+    command: List[str],
+) -> str:
+    """Run a command in a workload container of a Kubernetes charm unit.
 
     Args:
-        app_or_unit_name(str): Juju application or unit name. If not specified, status
+        model_name(str): Juju model name
+        application_name(str): Juju application name
+        unit_number(int): Application unit number
+        container_name(str): Workload container name
+        command(List[str]): Command to run
+
+    Returns:
+        str: Command output
+
+    Raises:
+        JujuError: Custom error raised when running the command fails
+    """
+    unit_name = f"{application_name}/{unit_number}"
+    try:
+        with span("juju ssh", category="juju", unit=unit_name, container=container_name):
+            return check_output(
+                [
+                    "juju",
+                    "ssh",
+                    "-m",
+                    model_name,
+                    "--container",
+                    container_name,
+                    unit_name,
+                    *command,
+                ]
+            ).decode()
+    except CalledProcessError as e:
+        raise JujuError(f"Failed to run {command} in {container_name} of {unit_name}!") from e
+
+
+def juju_status(model_name: str, *app_or_unit_names: str) -> dict:
+    """Return status of the model, applications or units.
+
+    Args:
+        model_name(str): Juju model name
+        app_or_unit_names(str): Juju application or unit names. If not specified, status
             model will be returned
 
     Returns:
-        dict(str): Dictionary representing status of requested entity
+        dict(str): Dictionary representing status of requested entities
     """
-    juju_status_args = ["juju", "status", app_or_unit_name, "--format=json"]
-    status = json.loads(check_output([arg for arg in juju_status_args if arg]).decode())
+    juju_status_args = ["juju", "status", "-m", model_name, *app_or_unit_names, "--format=json"]
+    with span("juju status", category="juju", model=model_name):
+        status = json.loads(check_output(juju_status_args).decode())
     return status["applications"]
 
 
@@ -138,14 +350,11 @@ def set_model_config(model_name: str, config: dict):
     Raises:
         JujuError: Custom error raised when setting Juju model config fails
     """
-    with juju_context(model_name):
-        for model_key, value in config.items():
-            try:
-                call(["juju", "model-config", f"{model_key}={value}"])
-            except CalledProcessError as e:
-                raise JujuError(
-                    f"Failed to set {model_key}={value} config for {model_name}"
-                ) from e
+    for model_key, value in config.items():
+        try:
+            call(["juju", "model-config", "-m", model_name, f"{model_key}={value}"])
+        except CalledProcessError as e:
+            raise JujuError(f"Failed to set {model_key}={value} config for {model_name}") from e
 
 
 def set_application_config(model_name: str, application_name: str, config: dict):
@@ -159,14 +368,13 @@ def set_application_config(model_name: str, application_name: str, config: dict)
     Raises:
         JujuError: Custom error raised when setting Juju application config fails
     """
-    with juju_context(model_name):
-        for model_key, value in config.items():
-            try:
-                call(["juju", "config", application_name, f"{model_key}={value}"])
-            except CalledProcessError as e:
-                raise JujuError(
-                    f"Failed to set {model_key}={value} config for {application_name}"
-                ) from e
+    for model_key, value in config.items():
+        try:
+            call(["juju", "config", "-m", model_name, application_name, f"{model_key}={value}"])
+        except CalledProcessError as e:
+            raise JujuError(
+                f"Failed to set {model_key}={value} config for {application_name}"
+            ) from e
     juju_wait_for_active_idle(model_name, 60)
 
 
@@ -188,38 +396,13 @@ def _get_juju_secret_id(model_name: str, juju_secret_label: str) -> Optional[str
         model_name(str): Juju model name
         juju_secret_label(str): Juju secret label
     """
-    with juju_context(model_name):
-        cmd_out = check_output(["juju", "secrets", "--format=json"]).decode()
-        for key, value in json.loads(cmd_out).items():
-            if value["label"] == juju_secret_label:
-                return key
+    cmd_out = check_output(["juju", "secrets", "-m", model_name, "--format=json"]).decode()
+    for key, value in json.loads(cmd_out).items():
+        if value["label"] == juju_secret_label:
+            return key
     return None
 
 
-def wait_for_nms_credentials(
-    model_name, juju_secret_label, timeout=300
-) -> Tuple[Optional[str], Optional[str]]:
-    """Wait for NMS credentials to be available in Juju secret.
-
-    Args:
-        model_name(str): Juju model name
-        juju_secret_label(str): Juju secret label
-        timeout(int): Time to wait for the credentials to be available
-
-    Raises:
-        TimeoutError: Raised if NMS credentials are not available within given time
-    """
-    now = time.time()
-    while time.time() - now <= timeout:
-        username, password = get_nms_credentials(model_name, juju_secret_label)
-        if username and password:
-            return username, password
-        time.sleep(5)
-    raise TimeoutError(
-        f"Timed out waiting for NMS credentials in juju secret after {timeout} seconds!"
-    )
-
-
 def get_nms_credentials(
     model_name: str, juju_secret_label: str
 ) -> Tuple[Optional[str], Optional[str]]:
@@ -247,29 +430,11 @@ def get_nms_credentials(
     if not secret_id:
         logger.warning("could not find secret with label %s", juju_secret_label)
         return None, None
-    with juju_context(model_name):
-        cmd_out = check_output(
-            ["juju", "show-secret", "--reveal", "--format=json", secret_id]
-        ).decode()
-        secret_content = json.loads(cmd_out)[secret_id]["content"]["Data"]
-        return secret_content.get("username"), secret_content.get("password")
-
-
-@contextmanager
-def juju_context(model_name: str):
-    """Allow changing currently active Juju model.
-
-    Args:
-        model_name(str): Juju model name
-
-    Raises:
-        JujuError: Custom error raised when changing Juju model fails
-    """
-    try:
-        call(["juju", "switch", model_name])
-        yield f"Current Juju model changed to {model_name}"
-    except CalledProcessError as e:
-        raise JujuError(f"Switching Juju model to {model_name} failed!") from e
+    cmd_out = check_output(
+        ["juju", "show-secret", "-m", model_name, "--reveal", "--format=json", secret_id]
+    ).decode()
+    secret_content = json.loads(cmd_out)[secret_id]["content"]["Data"]
+    return secret_content.get("username"), secret_content.get("password")
 
 
 class JujuError(Exception):
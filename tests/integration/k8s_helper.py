@@ -2,11 +2,11 @@
 # Copyright 2025 Canonical Ltd.
 
 import logging
-from typing import Optional
+from typing import List, Optional, Tuple
 
 from lightkube.core.client import Client
-from lightkube.core.exceptions import ApiError
-from lightkube.resources.core_v1 import Service
+from lightkube.core.exceptions import ApiError, ConfigError
+from lightkube.resources.core_v1 import Pod, Service
 
 logger = logging.getLogger(__name__)
 
@@ -33,3 +33,18 @@ def get_loadbalancer_service_external_ip(service_name, namespace) -> Optional[st
         raise KubernetesError("Unable to get Ingress address for service %s", service_name)
 
     return ingress_address.ip
+
+
+def get_pod_containers(namespace: str) -> List[Tuple[str, str]]:
+    """Return names of all pods and their containers in a given namespace."""
+    try:
+        pods = list(Client().list(Pod, namespace=namespace))
+    except (ApiError, ConfigError) as e:
+        raise KubernetesError(f"Unable to list pods in namespace {namespace}") from e
+    pod_containers = []
+    for pod in pods:
+        if not pod.metadata or not pod.metadata.name or not pod.spec:
+            continue
+        for container in pod.spec.containers:
+            pod_containers.append((pod.metadata.name, container.name))
+    return pod_containers
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# Copyright 2025 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""Module used to time phases of the test suite and export the results."""
+
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Optional, TypeVar
+
+if TYPE_CHECKING:
+    from tests.integration.retry_helper import RetryStats
+
+logger = logging.getLogger(__name__)
+
+METRICS_PREFIX = "sdcore_tests"
+MAX_SPANS = 100_000
+
+T = TypeVar("T")
+
+
+@dataclass
+class Span:
+    """A timed phase of the test suite."""
+
+    name: str
+    category: str
+    start: float
+    duration: float = 0.0
+    thread_id: int = 0
+    thread_name: str = ""
+    attributes: Dict[str, str] = field(default_factory=dict)
+
+
+_spans: List[Span] = []
+_spans_lock = threading.Lock()
+_dropped_spans = 0
+_epoch = time.perf_counter()
+
+
+@contextmanager
+def span(name: str, category: str = "test", **attributes) -> Iterator[Span]:
+    """Time the enclosed block of code.
+
+    Args:
+        name(str): Name of the phase
+        category(str): Category of the phase, e.g. `terraform`, `juju`, `nms`, `wait`
+        attributes: Additional attributes shown in the trace viewer
+
+    Yields:
+        Span: The span being recorded
+    """
+    thread = threading.current_thread()
+    current = Span(
+        name=name,
+        category=category,
+        start=time.perf_counter() - _epoch,
+        thread_id=thread.ident or 0,
+        thread_name=thread.name,
+        attributes={key: str(value) for key, value in attributes.items()},
+    )
+    try:
+        yield current
+    finally:
+        current.duration = time.perf_counter() - _epoch - current.start
+        _record(current)
+
+
+def timed(name: str, category: str = "test") -> Callable[[Callable[..., T]], Callable[..., T]]:
+    """Return a decorator timing every call of the decorated function.
+
+    Args:
+        name(str): Name of the phase
+        category(str): Category of the phase
+
+    Returns:
+        Callable: Decorator
+    """
+
+    def decorator(func: Callable[..., T]) -> Callable[..., T]:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs) -> T:
+            with span(name, category):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def get_spans() -> List[Span]:
+    """Return spans recorded since the start of the session."""
+    with _spans_lock:
+        return list(_spans)
+
+
+def export_chrome_trace(path: str) -> None:
+    """Write recorded spans in the Chrome trace event format.
+
+    The file can be opened in `chrome://tracing` or https://ui.perfetto.dev.
+
+    Args:
+        path(str): Path of the JSON file to write
+    """
+    pid = os.getpid()
+    spans = get_spans()
+    events: List[dict] = [
+        {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": thread}}
+        for tid, thread in {s.thread_id: s.thread_name for s in spans}.items()
+    ]
+    for recorded in spans:
+        events.append(
+            {
+                "name": recorded.name,
+                "cat": recorded.category,
+                "ph": "X",
+                "ts": round(recorded.start * 1_000_000),
+                "dur": round(recorded.duration * 1_000_000),
+                "pid": pid,
+                "tid": recorded.thread_id,
+                "args": recorded.attributes,
+            }
+        )
+    _write(path, json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}))
+
+
+def export_openmetrics(path: str, retry_stats: Optional[Dict[str, "RetryStats"]] = None) -> None:
+    """Write durations of recorded spans and retry statistics in the OpenMetrics text format.
+
+    Args:
+        path(str): Path of the text file to write
+        retry_stats(dict): Retry statistics keyed by the operation name
+    """
+    durations: Dict[tuple, List[float]] = {}
+    for recorded in get_spans():
+        durations.setdefault((recorded.category, recorded.name), []).append(recorded.duration)
+    family = f"{METRICS_PREFIX}_phase_duration_seconds"
+    lines = [
+        f"# TYPE {family} summary",
+        f"# UNIT {family} seconds",
+        f"# HELP {family} Time spent in phases of the test suite.",
+    ]
+    for (category, name), values in sorted(durations.items()):
+        labels = _labels(category=category, phase=name)
+        lines.append(f"{family}_count{labels} {len(values)}")
+        lines.append(f"{family}_sum{labels} {sum(values):.6f}")
+    lines += _retry_metrics(retry_stats or {})
+    lines += [
+        f"# TYPE {METRICS_PREFIX}_dropped_spans counter",
+        f"# HELP {METRICS_PREFIX}_dropped_spans Spans not recorded because of the span limit.",
+        f"{METRICS_PREFIX}_dropped_spans_total {_dropped_spans}",
+        "# EOF",
+    ]
+    _write(path, "\n".join(lines) + "\n")
+
+
+def log_slowest_spans(count: int = 10) -> None:
+    """Log the slowest phases of the test suite."""
+    for recorded in sorted(get_spans(), key=lambda s: s.duration, reverse=True)[:count]:
+        logger.info("%8.1fs  [%s] %s", recorded.duration, recorded.category, recorded.name)
+
+
+def _retry_metrics(retry_stats: Dict[str, "RetryStats"]) -> List[str]:
+    """Return OpenMetrics lines of retry statistics."""
+    lines = []
+    counters = (
+        ("retries", "retries", "Retries of operations and polls of conditions."),
+        ("retry_failures", "failures", "Operations which failed after retrying."),
+        ("wait_seconds", "time_waited", "Time spent waiting between retries."),
+    )
+    for metric, attribute, description in counters:
+        family = f"{METRICS_PREFIX}_{metric}"
+        lines += [f"# TYPE {family} counter", f"# HELP {family} {description}"]
+        if attribute == "time_waited":
+            lines.append(f"# UNIT {family} seconds")
+        for operation, stats in sorted(retry_stats.items()):
+            labels = _labels(operation=operation)
+            lines.append(f"{family}_total{labels} {getattr(stats, attribute)}")
+    return lines
+
+
+def _labels(**labels: str) -> str:
+    """Format OpenMetrics labels, escaping their values."""
+    escaped = {
+        key: value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        for key, value in labels.items()
+    }
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped.items()) + "}"
+
+
+def _record(recorded: Span) -> None:
+    """Store a finished span, unless the span limit has been reached."""
+    global _dropped_spans
+    with _spans_lock:
+        if len(_spans) >= MAX_SPANS:
+            _dropped_spans += 1
+            return
+        _spans.append(recorded)
+
+
+def _write(path: str, content: str) -> None:
+    """Write content to a file, creating its directory if needed."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, mode="w") as file:
+        file.write(content)
+    logger.info("Metrics written to %s", path)
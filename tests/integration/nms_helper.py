@@ -6,12 +6,15 @@
 
 import json
 import logging
-import time
+import threading
 from dataclasses import asdict, dataclass
 from typing import Any, List, Optional
 
 import requests
 
+from tests.integration.metrics_helper import span
+from tests.integration.retry_helper import wait_until
+
 logger = logging.getLogger(__name__)
 
 ACCOUNTS_URL = "config/v1/account"
@@ -51,7 +54,7 @@ NETWORK_SLICE_CONFIG = {
     "site-info": {
         "site-name": "demo",
         "plmn": {"mcc": "001", "mnc": "01"},
-        "gNodeBs": [{"name": "ran-gnbsim-gnbsim", "tac": 1}],
+        "gNodeBs": [],
         "upf": {"upf-name": "upf-external", "upf-port": "8805"},
     },
 }
@@ -100,13 +103,14 @@ class NMS:
             headers["Authorization"] = f"Bearer {token}"
         url = f"{self.url}{endpoint}"
         try:
-            response = requests.request(
-                method=method,
-                url=url,
-                headers=headers,
-                json=data,
-                verify=False,
-            )
+            with span(f"NMS {method} {endpoint}", category="nms"):
+                response = requests.request(
+                    method=method,
+                    url=url,
+                    headers=headers,
+                    json=data,
+                    verify=False,
+                )
         except requests.exceptions.SSLError as e:
             logger.error("SSL error: %s", e)
             return None
@@ -149,23 +153,24 @@ class NMS:
             )
         return None
 
-    def wait_for_api_to_be_available(self, timeout: int = 300) -> None:
-        """Wait for NMS API to be available."""
-        t0 = time.time()
-        while time.time() - t0 < timeout:
-            if self.is_api_available():
-                return
-            time.sleep(5)
-        raise TimeoutError(f"NMS API is not available after {timeout} seconds.")
-
-    def wait_for_initialized(self, timeout: int = 300) -> None:
-        """Wait for NMS to be initialized."""
-        t0 = time.time()
-        while time.time() - t0 < timeout:
-            if self.is_initialized():
-                return
-            time.sleep(5)
-        raise TimeoutError(f"NMS is not initialized after {timeout} seconds.")
+    def wait_for_api_to_be_available(
+        self, timeout: int = 300, cancelled: Optional[threading.Event] = None
+    ) -> None:
+        """Wait for NMS API to be available, unless the wait is cancelled."""
+        wait_until(
+            self.is_api_available,
+            name="NMS API to be available",
+            timeout=timeout,
+            cancelled=cancelled,
+        )
+
+    def wait_for_initialized(
+        self, timeout: int = 300, cancelled: Optional[threading.Event] = None
+    ) -> None:
+        """Wait for NMS to be initialized, unless the wait is cancelled."""
+        wait_until(
+            self.is_initialized, name="NMS to be initialized", timeout=timeout, cancelled=cancelled
+        )
 
     def login(self, username: str, password: str) -> LoginResponse | None:
         """Login to NMS by sending the username and password and return a Token."""
@@ -192,9 +197,12 @@ class NMS:
         self._make_request("POST", url, token=token, data=DEVICE_GROUP_CONFIG)
         logger.info(f"Created device group {name}.")
 
-    def create_network_slice(self, name: str, device_groups: List[str], token: str) -> None:
+    def create_network_slice(
+        self, name: str, device_groups: List[str], gnodeb_name: str, token: str
+    ) -> None:
         """Create a network slice."""
         NETWORK_SLICE_CONFIG["site-device-group"] = device_groups
+        NETWORK_SLICE_CONFIG["site-info"]["gNodeBs"] = [{"name": gnodeb_name, "tac": 1}]
         url = f"/config/v1/network-slice/{name}"
         self._make_request("POST", url, token=token, data=NETWORK_SLICE_CONFIG)
         logger.info(f"Created network slice {name}.")
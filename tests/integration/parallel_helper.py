@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# Copyright 2025 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""Module used to isolate test sessions sharing a single Juju controller."""
+
+import fcntl
+import logging
+import os
+import re
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, TextIO, Tuple
+
+from tests.integration.retry_helper import wait_until
+
+logger = logging.getLogger(__name__)
+
+RUN_ID_ENV = "SDCORE_TESTS_RUN_ID"
+XDIST_WORKER_ENV = "PYTEST_XDIST_WORKER"
+
+
+def get_namespace_suffix() -> str:
+    """Return the suffix isolating resources of the current test run and worker.
+
+    The suffix is built from the `SDCORE_TESTS_RUN_ID` environment variable and the name of the
+    pytest-xdist worker. When neither is set, the suffix is empty, so resource names are the same
+    as in a non-parallel run.
+
+    Returns:
+        str: Suffix to append to Juju model names, e.g. `-1234-gw0`
+    """
+    parts = [os.getenv(RUN_ID_ENV, ""), os.getenv(XDIST_WORKER_ENV, "")]
+    suffix = "-".join(_sanitize(part) for part in parts if _sanitize(part))
+    return f"-{suffix}" if suffix else ""
+
+
+def namespaced_model_name(model_name: str) -> str:
+    """Return the name of a Juju model isolated for the current test run and worker.
+
+    Args:
+        model_name(str): Base Juju model name
+
+    Returns:
+        str: Namespaced Juju model name
+    """
+    return f"{model_name}{get_namespace_suffix()}"
+
+
+@contextmanager
+def deployment_slot(lock_dir: str, max_parallel: int, timeout: int = 3600) -> Iterator[int]:
+    """Hold one of a limited number of deployment slots shared by all local test processes.
+
+    Slots are implemented as exclusive locks on files in `lock_dir`, so they are released by the
+    kernel even if the test process gets killed.
+
+    Args:
+        lock_dir(str): Directory holding the slot lock files
+        max_parallel(int): Maximum number of concurrent deployments
+        timeout(int): Time to wait for a free slot
+
+    Yields:
+        int: Number of the acquired slot
+
+    Raises:
+        TimeoutError: Raised if no slot becomes free within given time
+    """
+    os.makedirs(lock_dir, exist_ok=True)
+    acquired: List[Tuple[int, TextIO]] = []
+
+    def slot_acquired() -> bool:
+        if slot := _try_acquire_slot(lock_dir, max_parallel):
+            acquired.append(slot)
+        return bool(acquired)
+
+    wait_until(slot_acquired, name="a free deployment slot", timeout=timeout)
+    slot, lock_file = acquired[0]
+    logger.info("Acquired deployment slot %s", slot)
+    try:
+        yield slot
+    finally:
+        fcntl.flock(lock_file, fcntl.LOCK_UN)
+        lock_file.close()
+        logger.info("Released deployment slot %s", slot)
+
+
+def _try_acquire_slot(lock_dir: str, max_parallel: int) -> Optional[Tuple[int, TextIO]]:
+    """Lock the first free slot lock file.
+
+    Returns:
+        tuple: Number of the acquired slot and its locked file or None if all slots are busy
+    """
+    for slot in range(max(max_parallel, 1)):
+        lock_file = open(os.path.join(lock_dir, f"deployment-{slot}.lock"), mode="w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            continue
+        return slot, lock_file
+    return None
+
+
+def _sanitize(value: str) -> str:
+    """Make a value usable as a part of a Juju model and Kubernetes namespace name."""
+    return re.sub(r"[^a-z0-9]+", "-", value.lower()).strip("-")
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# Copyright 2025 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""Module used to wait for parts of a deployment, rather than the whole Juju model."""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+from tests.integration import juju_helper
+from tests.integration.retry_helper import RetryPolicy, wait_until
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ReadinessCheck:
+    """A named condition which has to hold for a gate to open."""
+
+    description: str
+    is_satisfied: Callable[[], bool]
+
+
+@dataclass
+class ReadinessGate:
+    """A set of checks, and gates they depend on, guarding a step of the test flow.
+
+    Prerequisite gates are checked first, so a gate only polls its own checks once
+    everything it depends on is ready.
+    """
+
+    name: str
+    checks: List[ReadinessCheck]
+    prerequisites: List["ReadinessGate"] = field(default_factory=list)
+
+    def is_open(self) -> bool:
+        """Return whether all prerequisites are open and all checks are satisfied."""
+        if not all(prerequisite.is_open() for prerequisite in self.prerequisites):
+            return False
+        for check in self.checks:
+            if not check.is_satisfied():
+                logger.info("Gate %s is waiting for: %s", self.name, check.description)
+                return False
+        return True
+
+    def wait(
+        self,
+        timeout: int,
+        policy: Optional[RetryPolicy] = None,
+        cancelled: Optional[threading.Event] = None,
+    ) -> None:
+        """Wait for the gate to open.
+
+        Args:
+            timeout(int): Time to wait for the gate to open
+            policy(RetryPolicy): Backoff between checks
+            cancelled(threading.Event): Event which, once set, stops waiting
+
+        Raises:
+            TimeoutError: Raised if the gate does not open within given time
+            WaitCancelledError: Raised if waiting is cancelled before the gate opens
+        """
+        t0 = time.monotonic()
+        wait_until(
+            self.is_open,
+            name=f"gate {self.name} to open",
+            timeout=timeout,
+            policy=policy,
+            cancelled=cancelled,
+        )
+        logger.info("Gate %s is open after %.0f seconds", self.name, time.monotonic() - t0)
+
+
+def applications_active_idle(model_name: str, application_names: List[str]) -> ReadinessCheck:
+    """Return a check satisfied when given applications are Active-Idle.
+
+    Args:
+        model_name(str): Juju model name
+        application_names(List[str]): Juju application names
+
+    Returns:
+        ReadinessCheck: Readiness check
+    """
+    return ReadinessCheck(
+        description=f"{', '.join(application_names)} in {model_name} to be Active-Idle",
+        is_satisfied=lambda: juju_helper.juju_model_is_active_idle(model_name, application_names),
+    )
+
+
+def nms_credentials_available(model_name: str, juju_secret_label: str) -> ReadinessCheck:
+    """Return a check satisfied when NMS credentials are available in a Juju secret.
+
+    Args:
+        model_name(str): Juju model name
+        juju_secret_label(str): Juju secret label
+
+    Returns:
+        ReadinessCheck: Readiness check
+    """
+    return ReadinessCheck(
+        description=f"NMS credentials in {juju_secret_label} secret",
+        is_satisfied=lambda: all(juju_helper.get_nms_credentials(model_name, juju_secret_label)),
+    )
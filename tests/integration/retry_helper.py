@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+# Copyright 2025 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""Module used to retry operations and wait for conditions within a time budget."""
+
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple, Type, TypeVar
+
+from tests.integration.metrics_helper import span
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class WaitCancelledError(Exception):
+    """Raised when a wait is cancelled before its condition is met."""
+
+
+@dataclass
+class RetryPolicy:
+    """Backoff and error classification used when retrying an operation.
+
+    Delays grow exponentially from `initial_delay` up to `max_delay`. Each delay is randomized
+    by up to `jitter` of its value, so concurrent clients don't poll in lockstep.
+
+    An error is retried if it's an instance of `retryable` and not of `fatal`, unless
+    `is_retryable` is given, in which case it decides alone.
+    """
+
+    initial_delay: float = 5
+    max_delay: float = 30
+    multiplier: float = 2
+    jitter: float = 0.2
+    max_attempts: Optional[int] = None
+    retryable: Tuple[Type[BaseException], ...] = (Exception,)
+    fatal: Tuple[Type[BaseException], ...] = ()
+    is_retryable: Optional[Callable[[BaseException], bool]] = None
+
+    def delay(self, attempt: int) -> float:
+        """Return the delay before the next attempt.
+
+        Args:
+            attempt(int): Number of the failed attempt, starting from 1
+
+        Returns:
+            float: Delay in seconds
+        """
+        delay = min(self.initial_delay * self.multiplier ** (attempt - 1), self.max_delay)
+        return max(delay * (1 + random.uniform(-self.jitter, self.jitter)), 0)
+
+    def classify(self, error: BaseException) -> bool:
+        """Return whether an error is worth retrying."""
+        if self.is_retryable:
+            return self.is_retryable(error)
+        return isinstance(error, self.retryable) and not isinstance(error, self.fatal)
+
+
+class Deadline:
+    """Time budget shared by the stages of a test session.
+
+    Each stage asks for its usual timeout and gets no more than what is left of the budget,
+    so the timeouts of all stages add up to at most the session budget.
+    """
+
+    def __init__(self, budget: float, name: str = "session"):
+        self.name = name
+        self.budget = budget
+        self.expires_at = time.monotonic() + budget
+
+    def remaining(self) -> float:
+        """Return the number of seconds left before the deadline."""
+        return max(self.expires_at - time.monotonic(), 0)
+
+    def expired(self) -> bool:
+        """Return whether the deadline has passed."""
+        return self.remaining() <= 0
+
+    def timeout(self, requested: float) -> int:
+        """Return the timeout of a stage, capped by the time left before the deadline.
+
+        Args:
+            requested(float): Timeout the stage would use without a deadline
+
+        Returns:
+            int: Timeout of the stage in seconds
+
+        Raises:
+            TimeoutError: Raised if the deadline has already passed
+        """
+        if self.expired():
+            raise TimeoutError(f"The {self.name} time budget of {self.budget:.0f}s is exhausted!")
+        return max(int(min(requested, self.remaining())), 1)
+
+
+@dataclass
+class RetryStats:
+    """Retry statistics of a named operation."""
+
+    calls: int = 0
+    attempts: int = 0
+    retries: int = 0
+    failures: int = 0
+    time_waited: float = 0.0
+
+
+_retry_stats: Dict[str, RetryStats] = {}
+_retry_stats_lock = threading.Lock()
+
+
+def get_retry_stats() -> Dict[str, RetryStats]:
+    """Return retry statistics of all operations since the start of the session."""
+    with _retry_stats_lock:
+        return {name: RetryStats(**vars(stats)) for name, stats in _retry_stats.items()}
+
+
+def log_retry_stats() -> None:
+    """Log retry statistics of all operations since the start of the session."""
+    for name, stats in sorted(get_retry_stats().items()):
+        logger.info(
+            "%s: %s calls, %s retries, %s failures, %.0f seconds spent waiting",
+            name,
+            stats.calls,
+            stats.retries,
+            stats.failures,
+            stats.time_waited,
+        )
+
+
+def _record(name: str, **increments) -> None:
+    """Add increments to the retry statistics of an operation."""
+    with _retry_stats_lock:
+        stats = _retry_stats.setdefault(name, RetryStats())
+        for key, increment in increments.items():
+            setattr(stats, key, getattr(stats, key) + increment)
+
+
+def retry(
+    func: Callable[[], T],
+    name: str,
+    policy: Optional[RetryPolicy] = None,
+    deadline: Optional[Deadline] = None,
+) -> T:
+    """Call a function until it succeeds, a fatal error occurs or the retries run out.
+
+    Args:
+        func(Callable): Function to call
+        name(str): Name of the operation used in logs and statistics
+        policy(RetryPolicy): Backoff and error classification. Defaults to `RetryPolicy()`
+        deadline(Deadline): Deadline after which no more attempts are made
+
+    Returns:
+        Return value of the function
+
+    Raises:
+        The last error raised by the function if it's fatal or the retries run out
+    """
+    policy = policy or RetryPolicy()
+    _record(name, calls=1)
+    with span(name, category="retry"):
+        return _retry(func, name, policy, deadline)
+
+
+def _retry(
+    func: Callable[[], T], name: str, policy: RetryPolicy, deadline: Optional[Deadline]
+) -> T:
+    """Call a function until it succeeds, a fatal error occurs or the retries run out."""
+    attempt = 0
+    while True:
+        attempt += 1
+        _record(name, attempts=1)
+        try:
+            return func()
+        except Exception as e:
+            delay = policy.delay(attempt)
+            out_of_attempts = policy.max_attempts is not None and attempt >= policy.max_attempts
+            out_of_time = deadline is not None and deadline.remaining() < delay
+            if not policy.classify(e) or out_of_attempts or out_of_time:
+                _record(name, failures=1)
+                raise
+            logger.warning(
+                "%s failed (attempt %s): %s. Retrying in %.1f seconds...", name, attempt, e, delay
+            )
+            _record(name, retries=1, time_waited=delay)
+            time.sleep(delay)
+
+
+def wait_until(
+    condition: Callable[[], bool],
+    name: str,
+    timeout: float,
+    policy: Optional[RetryPolicy] = None,
+    cancelled: Optional[threading.Event] = None,
+) -> None:
+    """Wait for a condition to be met, polling it with backoff.
+
+    Errors raised by the condition are classified by the policy. Retryable errors count as the
+    condition not being met yet, other errors stop the wait.
+
+    Args:
+        condition(Callable): Function returning whether the condition is met
+        name(str): Name of the condition used in logs, statistics and the timeout error
+        timeout(float): Time to wait for the condition to be met
+        policy(RetryPolicy): Backoff between polls and error classification.
+            Defaults to `RetryPolicy()`
+        cancelled(threading.Event): Event which, once set, stops the wait
+
+    Raises:
+        TimeoutError: Raised if the condition is not met within given time
+        WaitCancelledError: Raised if the wait is cancelled before the condition is met
+        The error raised by the condition if it's not retryable
+    """
+    policy = policy or RetryPolicy()
+    cancelled = cancelled or threading.Event()
+    _record(name, calls=1)
+    with span(name, category="wait"):
+        _wait_until(condition, name, timeout, policy, cancelled)
+
+
+def _wait_until(
+    condition: Callable[[], bool],
+    name: str,
+    timeout: float,
+    policy: RetryPolicy,
+    cancelled: threading.Event,
+) -> None:
+    """Wait for a condition to be met, polling it with backoff."""
+    t0 = time.monotonic()
+    attempt = 0
+    last_error: Optional[Exception] = None
+    while True:
+        if cancelled.is_set():
+            raise WaitCancelledError(f"Waiting for {name} was cancelled!")
+        attempt += 1
+        _record(name, attempts=1)
+        try:
+            if condition():
+                return
+            last_error = None
+        except Exception as e:
+            if not policy.classify(e):
+                _record(name, failures=1)
+                raise
+            logger.warning("Checking %s failed (attempt %s): %s", name, attempt, e)
+            last_error = e
+        elapsed = time.monotonic() - t0
+        if elapsed >= timeout:
+            _record(name, failures=1)
+            raise TimeoutError(
+                f"Timed out waiting for {name} after {timeout:.0f} seconds!"
+            ) from last_error
+        delay = min(policy.delay(attempt), timeout - elapsed)
+        logger.info("Waiting for %s. Sleeping for %.1f seconds...", name, delay)
+        _record(name, retries=1, time_waited=delay)
+        cancelled.wait(delay)
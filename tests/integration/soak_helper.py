@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+# Copyright 2025 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""Module used to run gNB simulations repeatedly and detect degradation over time."""
+
+import json
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, TextIO, Tuple
+
+from tests.integration import juju_helper
+from tests.integration.retry_helper import Deadline
+
+logger = logging.getLogger(__name__)
+
+SECONDS_IN_HOUR = 3600
+MIN_TREND_SAMPLES = 3
+
+# Workload container of each SD-Core network function which memory usage is tracked
+NF_CONTAINERS = {
+    "amf": "amf",
+    "ausf": "ausf",
+    "nms": "nms",
+    "nrf": "nrf",
+    "nssf": "nssf",
+    "pcf": "pcf",
+    "smf": "smf",
+    "udm": "udm",
+    "udr": "udr",
+    "upf": "bessd",
+}
+
+CGROUP_MEMORY_FILES = (
+    "/sys/fs/cgroup/memory.current",
+    "/sys/fs/cgroup/memory/memory.usage_in_bytes",
+)
+
+
+@dataclass
+class SoakConfig:
+    """Configuration of a soak test.
+
+    The soak test ends when either `duration` or `iterations` is reached, whichever comes first.
+    """
+
+    results_path: str
+    duration: Optional[int] = None
+    iterations: Optional[int] = None
+    simulation_timeout: int = 6 * 60
+    memory_sample_interval: int = 300
+    max_memory_growth_per_hour: float = 0.1
+    max_duration_growth_per_hour: float = 0.25
+    min_success_rate: float = 0.95
+    # Shorter trends are reported, but warm-up growth extrapolated per hour would fail the test
+    min_trend_span_hours: float = 1.0
+
+
+@dataclass
+class SoakResult:
+    """Summary of a soak test."""
+
+    iterations: int = 0
+    failures: int = 0
+    elapsed: float = 0.0
+    duration_growth_per_hour: Optional[float] = None
+    memory_growth_per_hour: Dict[str, float] = field(default_factory=dict)
+    leaking_applications: List[str] = field(default_factory=list)
+    throughput_decay: bool = False
+
+    @property
+    def success_rate(self) -> float:
+        """Return the fraction of successful simulations."""
+        if not self.iterations:
+            return 0.0
+        return (self.iterations - self.failures) / self.iterations
+
+
+class Trend:
+    """Least squares linear fit of a series, updated incrementally in constant memory."""
+
+    __slots__ = ("count", "min_x", "max_x", "sum_x", "sum_y", "sum_xx", "sum_xy")
+
+    def __init__(self):
+        self.count = 0
+        self.min_x = 0.0
+        self.max_x = 0.0
+        self.sum_x = 0.0
+        self.sum_y = 0.0
+        self.sum_xx = 0.0
+        self.sum_xy = 0.0
+
+    def add(self, x: float, y: float) -> None:
+        """Add a sample to the series."""
+        self.min_x = min(self.min_x, x) if self.count else x
+        self.max_x = max(self.max_x, x)
+        self.count += 1
+        self.sum_x += x
+        self.sum_y += y
+        self.sum_xx += x * x
+        self.sum_xy += x * y
+
+    @property
+    def mean(self) -> float:
+        """Return the mean of the series values."""
+        return self.sum_y / self.count if self.count else 0.0
+
+    @property
+    def span(self) -> float:
+        """Return the range of the series sample positions."""
+        return self.max_x - self.min_x
+
+    @property
+    def slope(self) -> Optional[float]:
+        """Return the slope of the fitted line or None if there are not enough samples."""
+        if self.count < MIN_TREND_SAMPLES:
+            return None
+        denominator = self.count * self.sum_xx - self.sum_x**2
+        if not denominator:
+            return None
+        return (self.count * self.sum_xy - self.sum_x * self.sum_y) / denominator
+
+    @property
+    def relative_slope(self) -> Optional[float]:
+        """Return the slope relative to the mean of the series values."""
+        slope = self.slope
+        if slope is None or not self.mean:
+            return None
+        return slope / self.mean
+
+
+class SoakRunner:
+    """Run gNB simulations repeatedly and track their results and NF memory usage.
+
+    Every iteration and memory sample is appended to a JSON Lines file as soon as it's known,
+    so only the running trends are kept in memory, however long the soak test runs.
+
+    When a deadline is given, the soak test also ends once the time left before the deadline
+    is shorter than the simulation timeout.
+    """
+
+    def __init__(
+        self,
+        ran_model_name: str,
+        sdcore_model_name: str,
+        config: SoakConfig,
+        deadline: Optional[Deadline] = None,
+    ):
+        self.ran_model_name = ran_model_name
+        self.sdcore_model_name = sdcore_model_name
+        self.config = config
+        self.deadline = deadline
+
+    def run(self) -> SoakResult:
+        """Run the soak test.
+
+        Returns:
+            SoakResult: Summary of the soak test
+        """
+        result = SoakResult()
+        duration_trend = Trend()
+        memory_trends = {application: Trend() for application in NF_CONTAINERS}
+        results_dir = os.path.dirname(os.path.abspath(self.config.results_path))
+        os.makedirs(results_dir, exist_ok=True)
+        t0 = time.monotonic()
+        last_memory_sample = None
+        with open(self.config.results_path, mode="a") as results:
+            while not self._is_finished(result.iterations, time.monotonic() - t0):
+                now = time.monotonic()
+                if (
+                    last_memory_sample is None
+                    or now - last_memory_sample >= self.config.memory_sample_interval
+                ):
+                    self._sample_memory(results, memory_trends, (now - t0) / SECONDS_IN_HOUR)
+                    last_memory_sample = now
+                success, duration = self._run_simulation()
+                result.iterations += 1
+                if success:
+                    duration_trend.add((time.monotonic() - t0) / SECONDS_IN_HOUR, duration)
+                else:
+                    result.failures += 1
+                _write_record(
+                    results,
+                    record_type="iteration",
+                    iteration=result.iterations,
+                    success=success,
+                    duration=duration,
+                )
+                logger.info(
+                    "Soak iteration %s: success=%s, duration=%.1fs",
+                    result.iterations,
+                    success,
+                    duration,
+                )
+            self._sample_memory(results, memory_trends, (time.monotonic() - t0) / SECONDS_IN_HOUR)
+            result.elapsed = time.monotonic() - t0
+            self._evaluate(result, duration_trend, memory_trends)
+            _write_record(results, record_type="summary", **asdict(result))
+        return result
+
+    def _is_finished(self, iterations: int, elapsed: float) -> bool:
+        """Return whether the soak test reached its duration, iteration count or deadline."""
+        if self.deadline and self.deadline.remaining() < self.config.simulation_timeout:
+            logger.warning("Not enough time left before the %s deadline.", self.deadline.name)
+            return True
+        if self.config.iterations is not None and iterations >= self.config.iterations:
+            return True
+        if self.config.duration is not None and elapsed >= self.config.duration:
+            return True
+        return self.config.iterations is None and self.config.duration is None
+
+    def _run_simulation(self) -> Tuple[bool, float]:
+        """Run a single gNB simulation.
+
+        Returns:
+            bool: Whether the simulation succeeded
+            float: Duration of the simulation in seconds
+        """
+        t0 = time.monotonic()
+        try:
+            action_output = juju_helper.juju_run_action(
+                model_name=self.ran_model_name,
+                application_name="gnbsim",
+                unit_number=0,
+                action_name="start-simulation",
+                timeout=self.config.simulation_timeout,
+            )
+            success = action_output.get("success") == "true"
+        except juju_helper.JujuError as e:
+            logger.warning("Error when running simulation: %s", e)
+            success = False
+        return success, time.monotonic() - t0
+
+    def _sample_memory(self, results: TextIO, trends: Dict[str, Trend], elapsed_hours: float):
+        """Record memory usage of the workload container of every network function."""
+        for application, container in NF_CONTAINERS.items():
+            memory = self._get_memory_usage(application, container)
+            if memory is None:
+                continue
+            trends[application].add(elapsed_hours, memory)
+            _write_record(
+                results,
+                record_type="memory",
+                application=application,
+                elapsed_hours=elapsed_hours,
+                bytes=memory,
+            )
+
+    def _get_memory_usage(self, application: str, container: str) -> Optional[int]:
+        """Return memory usage of a workload container in bytes, as reported by its cgroup."""
+        for cgroup_memory_file in CGROUP_MEMORY_FILES:
+            try:
+                output = juju_helper.juju_exec_in_container(
+                    model_name=self.sdcore_model_name,
+                    application_name=application,
+                    unit_number=0,
+                    container_name=container,
+                    command=["cat", cgroup_memory_file],
+                )
+                return int(output.strip())
+            except (juju_helper.JujuError, ValueError):
+                continue
+        logger.warning("Failed to get memory usage of %s", application)
+        return None
+
+    def _evaluate(
+        self, result: SoakResult, duration_trend: Trend, memory_trends: Dict[str, Trend]
+    ) -> None:
+        """Flag memory leaks and throughput decay based on the fitted trends.
+
+        Trends covering less than `min_trend_span_hours` are only reported.
+        """
+        result.duration_growth_per_hour = duration_trend.relative_slope
+        if result.duration_growth_per_hour is not None and self._is_conclusive(
+            "simulation duration", duration_trend
+        ):
+            result.throughput_decay = (
+                result.duration_growth_per_hour > self.config.max_duration_growth_per_hour
+            )
+        for application, trend in memory_trends.items():
+            growth = trend.relative_slope
+            if growth is None:
+                continue
+            result.memory_growth_per_hour[application] = growth
+            if growth > self.config.max_memory_growth_per_hour and self._is_conclusive(
+                f"{application} memory", trend
+            ):
+                result.leaking_applications.append(application)
+
+    def _is_conclusive(self, name: str, trend: Trend) -> bool:
+        """Return whether a trend covers enough time to flag degradation."""
+        if trend.span >= self.config.min_trend_span_hours:
+            return True
+        logger.info(
+            "Trend of %s covers %.2f hours, less than %.2f hours. Not evaluating it.",
+            name,
+            trend.span,
+            self.config.min_trend_span_hours,
+        )
+        return False
+
+
+def _write_record(results: TextIO, record_type: str, **fields) -> None:
+    """Append a record to the soak test results and flush it to disk."""
+    results.write(json.dumps({"type": record_type, "time": time.time(), **fields}) + "\n")
+    results.flush()
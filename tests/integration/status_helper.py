@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# Copyright 2025 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""Module used to represent and compare `juju status` of large deployments."""
+
+from typing import Dict, Iterable, Optional, Tuple
+
+READY_WORKLOAD_STATUS = "active"
+READY_AGENT_STATUS = "idle"
+
+
+class UnitStatus:
+    """Status of a single Juju unit."""
+
+    __slots__ = (
+        "name",
+        "application",
+        "workload_status",
+        "workload_message",
+        "agent_status",
+        "address",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        application: str,
+        workload_status: str,
+        agent_status: str,
+        workload_message: str = "",
+        address: Optional[str] = None,
+    ):
+        self.name = name
+        self.application = application
+        self.workload_status = workload_status
+        self.agent_status = agent_status
+        self.workload_message = workload_message
+        self.address = address
+
+    @classmethod
+    def from_json(cls, name: str, application: str, unit_status: dict) -> "UnitStatus":
+        """Build the unit status from the `juju status --format=json` output of a unit."""
+        workload_status = unit_status.get("workload-status", {})
+        return cls(
+            name=name,
+            application=application,
+            workload_status=workload_status.get("current", "unknown"),
+            agent_status=unit_status.get("juju-status", {}).get("current", "unknown"),
+            workload_message=workload_status.get("message", ""),
+            address=unit_status.get("address"),
+        )
+
+    @property
+    def is_ready(self) -> bool:
+        """Return whether the unit is Active-Idle."""
+        return (
+            self.workload_status == READY_WORKLOAD_STATUS
+            and self.agent_status == READY_AGENT_STATUS
+        )
+
+    @property
+    def state(self) -> Tuple[str, str]:
+        """Return the workload and agent statuses of the unit."""
+        return self.workload_status, self.agent_status
+
+    def __eq__(self, other: object) -> bool:
+        """Return whether two unit statuses are the same."""
+        if not isinstance(other, UnitStatus):
+            return NotImplemented
+        return all(getattr(self, slot) == getattr(other, slot) for slot in self.__slots__)
+
+    def __repr__(self) -> str:
+        """Return a compact representation of the unit status."""
+        return f"UnitStatus({self.name}: {self.workload_status}/{self.agent_status})"
+
+
+class StatusDiff:
+    """Units which changed between two status snapshots."""
+
+    __slots__ = ("changed", "removed")
+
+    def __init__(self, changed: Dict[str, UnitStatus], removed: Tuple[str, ...]):
+        self.changed = changed
+        self.removed = removed
+
+    def __bool__(self) -> bool:
+        """Return whether any unit changed."""
+        return bool(self.changed or self.removed)
+
+
+class StatusSnapshot:
+    """Status of units in a Juju model at a point in time."""
+
+    __slots__ = ("applications", "units")
+
+    def __init__(self, applications: Tuple[str, ...], units: Dict[str, UnitStatus]):
+        self.applications = applications
+        self.units = units
+
+    @classmethod
+    def from_json(cls, applications_status: dict) -> "StatusSnapshot":
+        """Build the snapshot from the `applications` of `juju status --format=json` output."""
+        units = {}
+        for application, application_status in applications_status.items():
+            for unit_name, unit_status in application_status.get("units", {}).items():
+                units[unit_name] = UnitStatus.from_json(unit_name, application, unit_status)
+        return cls(applications=tuple(applications_status), units=units)
+
+    def applications_without_units(self) -> Tuple[str, ...]:
+        """Return applications which are deployed, but have no units yet."""
+        with_units = {unit.application for unit in self.units.values()}
+        return tuple(name for name in self.applications if name not in with_units)
+
+    def not_ready_units(self, ignored: Iterable[str] = ()) -> Dict[str, UnitStatus]:
+        """Return units which are not Active-Idle.
+
+        Args:
+            ignored(Iterable[str]): Substrings of names of units to ignore
+
+        Returns:
+            dict: Statuses of not ready units keyed by the unit name
+        """
+        ignored = tuple(ignored)
+        return {
+            name: unit
+            for name, unit in self.units.items()
+            if not unit.is_ready and not any(pattern in name for pattern in ignored)
+        }
+
+    def diff(self, previous: Optional["StatusSnapshot"]) -> StatusDiff:
+        """Return units which were added, changed or removed since a previous snapshot.
+
+        Args:
+            previous(StatusSnapshot): Previous snapshot. If not specified, all units are changed
+
+        Returns:
+            StatusDiff: Difference between the snapshots
+        """
+        if previous is None:
+            return StatusDiff(changed=dict(self.units), removed=())
+        changed = {
+            name: unit for name, unit in self.units.items() if previous.units.get(name) != unit
+        }
+        removed = tuple(name for name in previous.units if name not in self.units)
+        return StatusDiff(changed=changed, removed=removed)
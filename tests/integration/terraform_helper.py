@@ -2,16 +2,23 @@
 # Copyright 2024 Canonical Ltd.
 # See LICENSE file for licensing details.
 
+import glob
+import hashlib
 import logging
 import os
+import re
 from enum import Enum
 from shutil import which
-from subprocess import CalledProcessError, check_call
-from typing import Optional
+from subprocess import CalledProcessError, check_call, check_output
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs
+
+from tests.integration.metrics_helper import span
 
 logger = logging.getLogger(__name__)
 
 TERRAFORM_APP_NAME = "terraform"
+GIT_MODULE_SOURCE_REGEX = re.compile(r'^\s*source\s*=\s*"git::(?P<source>[^"]+)"', re.MULTILINE)
 
 
 class TerraformCommands(str, Enum):
@@ -39,17 +46,23 @@ class TerraformClient:
             raise TerraformError("Given `work_dir` does not exist!")
         self.work_dir = work_dir
 
-    def init(self):
+    def init(self, upgrade: bool = False):
         """Initialize the Terraform provider.
 
         Equivalent to `terraform init` CLI command.
 
+        Args:
+            upgrade (bool): Re-fetches modules and providers already installed in `work_dir`
+
         Raises:
             TerraformError: Custom error raised when initialization of the provider fails
         """
         logger.info(f"Running `{TERRAFORM_APP_NAME} {TerraformCommands.init}` in {self.work_dir}")
+        args = []
+        if upgrade:
+            args.append("-upgrade")
         try:
-            self._run_terraform_cmd(TerraformCommands.init)
+            self._run_terraform_cmd(TerraformCommands.init, *args)
         except CalledProcessError as e:
             raise TerraformError(
                 f"Error running `{TERRAFORM_APP_NAME} {TerraformCommands.init}`"
@@ -77,6 +90,67 @@ class TerraformClient:
                 f"Error running `{TERRAFORM_APP_NAME} {TerraformCommands.apply}`"
             ) from e
 
+    def fingerprint(self) -> str:
+        """Compute a fingerprint of the Terraform deployment defined in `work_dir`.
+
+        The fingerprint covers the content of all `.tf` and `.tfvars` files in the root module
+        and the revisions the Git module sources currently resolve to, so it changes whenever
+        applying the root module could change the deployment.
+
+        Returns:
+            str: SHA-256 hex digest identifying the deployment
+
+        Raises:
+            TerraformError: Custom error raised when resolving module revisions fails
+        """
+        with span("terraform fingerprint", category="terraform"):
+            digest = hashlib.sha256()
+            for file_path in self._get_root_module_files():
+                digest.update(os.path.basename(file_path).encode())
+                with open(file_path, mode="rb") as file:
+                    digest.update(file.read())
+            for source, revision in sorted(self._get_module_revisions().items()):
+                digest.update(f"{source}@{revision}".encode())
+            return digest.hexdigest()
+
+    def _get_root_module_files(self) -> List[str]:
+        """Return paths of the files defining the root module and its variables.
+
+        Returns:
+            list: Sorted list of `.tf` and `.tfvars` file paths
+        """
+        return sorted(
+            glob.glob(os.path.join(self.work_dir, "*.tf"))
+            + glob.glob(os.path.join(self.work_dir, "*.tfvars"))
+        )
+
+    def _get_module_revisions(self) -> Dict[str, str]:
+        """Resolve Git module sources used by the root module to commit hashes.
+
+        Returns:
+            dict: Commit hashes keyed by the module source
+
+        Raises:
+            TerraformError: Custom error raised when resolving module revisions fails
+        """
+        sources = set()
+        for file_path in glob.glob(os.path.join(self.work_dir, "*.tf")):
+            with open(file_path) as file:
+                sources.update(GIT_MODULE_SOURCE_REGEX.findall(file.read()))
+        revisions = {}
+        for source in sources:
+            address, _, query = source.partition("?")
+            ref = parse_qs(query).get("ref", ["HEAD"])[0]
+            scheme, _, path = address.partition("://")
+            repository_url = f"{scheme}://{path.split('//')[0]}"
+            try:
+                cmd_out = check_output(["git", "ls-remote", repository_url, ref]).decode()
+            except CalledProcessError as e:
+                raise TerraformError(f"Failed to resolve revision of {source}") from e
+            # A ref which is already a commit hash is not listed by `git ls-remote`
+            revisions[source] = cmd_out.split()[0] if cmd_out else ref
+        return revisions
+
     @staticmethod
     def _terraform_available() -> bool:
         """Check whether the Terraform executable is installed.
@@ -97,4 +171,5 @@ class TerraformClient:
             int: Command's return code
         """
         logger.info(f'Running: {" ".join([TERRAFORM_APP_NAME, terraform_command, *args])}')
-        return check_call([TERRAFORM_APP_NAME, terraform_command, *args], cwd=self.work_dir)
+        with span(" ".join([TERRAFORM_APP_NAME, terraform_command]), category="terraform"):
+            return check_call([TERRAFORM_APP_NAME, terraform_command, *args], cwd=self.work_dir)
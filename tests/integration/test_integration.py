@@ -5,8 +5,11 @@
 import json
 import logging
 import os
+import shutil
+import threading
 import time
-from typing import Tuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
 
 import pytest
 import requests
@@ -14,63 +17,159 @@ from jinja2 import Environment, FileSystemLoader
 from requests.auth import HTTPBasicAuth
 
 from tests.integration import juju_helper, k8s_helper
+from tests.integration.diagnostics_helper import collect_diagnostics
+from tests.integration.metrics_helper import span, timed
 from tests.integration.nms_helper import NMS
-from tests.integration.terraform_helper import TerraformClient
+from tests.integration.parallel_helper import (
+    deployment_slot,
+    get_namespace_suffix,
+    namespaced_model_name,
+)
+from tests.integration.readiness_helper import (
+    ReadinessGate,
+    applications_active_idle,
+    nms_credentials_available,
+)
+from tests.integration.retry_helper import Deadline, RetryPolicy, WaitCancelledError, retry
+from tests.integration.soak_helper import SoakConfig, SoakRunner
+from tests.integration.terraform_helper import TerraformClient, TerraformError
 
 logger = logging.getLogger(__name__)
 
-SDCORE_MODEL_NAME = "sdcore"
-RAN_MODEL_NAME = "ran"
-COS_MODEL_NAME = "cos-lite"
+SDCORE_MODEL_NAME = namespaced_model_name("sdcore")
+RAN_MODEL_NAME = namespaced_model_name("ran")
+COS_MODEL_NAME = namespaced_model_name("cos-lite")
 TERRAFORM_DIR = "terraform"
+TERRAFORM_RUNS_DIR = os.path.join(TERRAFORM_DIR, ".runs")
 TFVARS_FILE = "integration_tests.auto.tfvars"
+DEPLOYMENT_FINGERPRINTS_FILE = ".deployment-fingerprints.json"
+REUSE_DEPLOYMENT = os.getenv("SDCORE_TESTS_REUSE_DEPLOYMENT", "").lower() in ("1", "true", "yes")
+MAX_PARALLEL_DEPLOYMENTS = int(os.getenv("SDCORE_TESTS_MAX_PARALLEL_DEPLOYMENTS", "2"))
+DIAGNOSTICS_DIR = os.getenv("SDCORE_TESTS_DIAGNOSTICS_DIR", "diagnostics")
+DIAGNOSTICS_TIME_BUDGET = int(os.getenv("SDCORE_TESTS_DIAGNOSTICS_TIME_BUDGET", "300"))
+SOAK_DURATION = os.getenv("SDCORE_TESTS_SOAK_DURATION")
+SOAK_ITERATIONS = os.getenv("SDCORE_TESTS_SOAK_ITERATIONS")
+SOAK_RESULTS_PATH = os.getenv(
+    "SDCORE_TESTS_SOAK_RESULTS", f"soak-results{get_namespace_suffix()}.jsonl"
+)
+SESSION_BUDGET = int(
+    os.getenv("SDCORE_TESTS_SESSION_BUDGET", str(2 * 60 * 60 + int(SOAK_DURATION or 0)))
+)
+SESSION_DEADLINE = Deadline(SESSION_BUDGET)
 TEST_DEVICE_GROUP_NAME = "default-default"
 TEST_IMSI = "001010100007487"
 TEST_NETWORK_SLICE_NAME = "default"
 NMS_CREDENTIALS_LABEL = "NMS_LOGIN"
 
 
+@pytest.mark.xdist_group("sdcore")
 class TestSDCoreBundle:
+    sdcore_configuration: Optional[Future] = None
+    sdcore_configuration_cancelled = threading.Event()
+
     @classmethod
     def setup_class(cls):
-        juju_helper.create_model(SDCORE_MODEL_NAME)
-        juju_helper.create_model(RAN_MODEL_NAME)
+        for model_name in (SDCORE_MODEL_NAME, RAN_MODEL_NAME):
+            if REUSE_DEPLOYMENT and juju_helper.model_exists(model_name):
+                logger.info("Reusing existing Juju model: %s", model_name)
+                continue
+            juju_helper.create_model(model_name)
         juju_helper.set_model_config(
             model_name=SDCORE_MODEL_NAME,
             config={"update-status-hook-interval": "1m"},
         )
 
+    @classmethod
+    def teardown_class(cls):
+        """Destroy models of a namespaced test run, unless the deployment is to be reused.
+
+        Models of a non-namespaced run are left for the CI environment cleanup.
+        """
+        cls._stop_sdcore_configuration()
+        if not get_namespace_suffix() or REUSE_DEPLOYMENT:
+            return
+        for model_name in (RAN_MODEL_NAME, SDCORE_MODEL_NAME, COS_MODEL_NAME):
+            try:
+                juju_helper.destroy_model(model_name)
+            except juju_helper.JujuError as e:
+                logger.warning("Failed to tear down the test run: %s", e)
+        shutil.rmtree(_get_terraform_work_dir(), ignore_errors=True)
+
     @pytest.mark.abort_on_fail
     async def test_given_sdcore_terraform_module_when_deploy_then_status_is_active(self):
-        self._deploy_sdcore()
-        juju_helper.juju_wait_for_active_idle(model_name=SDCORE_MODEL_NAME, timeout=900)
+        work_dir = _get_terraform_work_dir()
+        self._prepare_terraform_work_dir(work_dir)
+        tf_client = TerraformClient(work_dir=os.path.join(os.getcwd(), work_dir))
+        # Computed before deploying, so a module revision released meanwhile can't be recorded
+        fingerprint = self._get_deployment_fingerprint(tf_client) if REUSE_DEPLOYMENT else None
+        if fingerprint and self._deployment_is_reusable(tf_client.work_dir, fingerprint):
+            logger.info("Healthy deployment matching the Terraform fingerprint found. Reusing it.")
+            self._start_sdcore_configuration()
+            return
+        with deployment_slot(lock_dir=TERRAFORM_RUNS_DIR, max_parallel=MAX_PARALLEL_DEPLOYMENTS):
+            try:
+                self._deploy_sdcore(tf_client, upgrade=REUSE_DEPLOYMENT)
+                # NMS is configured as soon as it's ready, while the rest of SD-Core is deploying
+                self._start_sdcore_configuration()
+                juju_helper.juju_wait_for_active_idle(
+                    model_name=SDCORE_MODEL_NAME, timeout=SESSION_DEADLINE.timeout(900)
+                )
+            except Exception:
+                self._stop_sdcore_configuration()
+                raise
+        if fingerprint:
+            self._save_deployment_fingerprint(tf_client.work_dir, fingerprint)
 
     @pytest.mark.abort_on_fail
     async def test_given_sdcore_bundle_and_gnbsim_deployed_when_start_simulation_then_simulation_success_status_is_true(  # noqa: E501
         self,
     ):
-        username, password = juju_helper.wait_for_nms_credentials(
-            model_name=SDCORE_MODEL_NAME,
-            juju_secret_label=NMS_CREDENTIALS_LABEL,
+        self._start_sdcore_configuration().result()
+        juju_helper.juju_wait_for_active_idle(
+            model_name=RAN_MODEL_NAME, timeout=SESSION_DEADLINE.timeout(300), time_idle=30
         )
-        if not username or not password:
-            raise Exception("NMS credentials not found.")
-        configure_sdcore(username, password)
-        juju_helper.juju_wait_for_active_idle(model_name=RAN_MODEL_NAME, timeout=300, time_idle=30)
-        for _ in range(3):
-            try:
-                action_output = juju_helper.juju_run_action(
-                    model_name=RAN_MODEL_NAME,
-                    application_name="gnbsim",
-                    unit_number=0,
-                    action_name="start-simulation",
-                    timeout=6 * 60,
-                )
-                assert action_output["success"] == "true"
-                return
-            except (AssertionError, KeyError) as e:
-                logger.warning("Error when running simulation: %s. Retrying...", e)
-        assert False
+
+        def run_simulation():
+            action_output = juju_helper.juju_run_action(
+                model_name=RAN_MODEL_NAME,
+                application_name="gnbsim",
+                unit_number=0,
+                action_name="start-simulation",
+                timeout=SESSION_DEADLINE.timeout(6 * 60),
+            )
+            assert action_output["success"] == "true"
+
+        retry(
+            run_simulation,
+            name="gNB simulation",
+            policy=RetryPolicy(
+                initial_delay=10, max_attempts=3, retryable=(AssertionError, KeyError)
+            ),
+            deadline=SESSION_DEADLINE,
+        )
+
+    @pytest.mark.skipif(
+        not SOAK_DURATION and not SOAK_ITERATIONS,
+        reason="Neither SDCORE_TESTS_SOAK_DURATION nor SDCORE_TESTS_SOAK_ITERATIONS is set",
+    )
+    async def test_given_sdcore_configured_when_running_simulations_repeatedly_then_no_memory_leak_nor_throughput_decay(  # noqa: E501
+        self,
+    ):
+        config = SoakConfig(
+            results_path=SOAK_RESULTS_PATH,
+            duration=int(SOAK_DURATION) if SOAK_DURATION else None,
+            iterations=int(SOAK_ITERATIONS) if SOAK_ITERATIONS else None,
+        )
+        result = SoakRunner(
+            ran_model_name=RAN_MODEL_NAME,
+            sdcore_model_name=SDCORE_MODEL_NAME,
+            config=config,
+            deadline=SESSION_DEADLINE,
+        ).run()
+        logger.info("Soak test finished: %s", result)
+        assert result.success_rate >= config.min_success_rate
+        assert not result.leaking_applications
+        assert not result.throughput_decay
 
     @pytest.mark.abort_on_fail
     async def test_given_external_hostname_configured_for_traefik_when_calling_sdcore_nms_then_configuration_tabs_are_available(  # noqa: E501
@@ -96,18 +195,58 @@ class TestSDCoreBundle:
         grafana_url, grafana_passwd = await self._get_grafana_url_and_admin_password()
         network_overview_dashboard_query = "%20".join(dashboard_name.split())
         request_url = f"{grafana_url}/api/search?query={network_overview_dashboard_query}"
-        for _ in range(3):
-            try:
-                resp = requests.get(
-                    url=request_url, auth=HTTPBasicAuth(username="admin", password=grafana_passwd)
-                )
-                resp.raise_for_status()
-                return
-            except (requests.exceptions.ConnectionError, requests.exceptions.HTTPError) as e:
-                logger.warning("Error when accessing Grafana dashboard: %s. Retrying...", str(e))
-        assert False
 
-    def _deploy_sdcore(self):
+        def search_dashboard():
+            resp = requests.get(
+                url=request_url, auth=HTTPBasicAuth(username="admin", password=grafana_passwd)
+            )
+            resp.raise_for_status()
+
+        retry(
+            search_dashboard,
+            name="Grafana dashboard search",
+            policy=RetryPolicy(
+                initial_delay=2, max_attempts=3, is_retryable=_is_retryable_http_error
+            ),
+            deadline=SESSION_DEADLINE,
+        )
+
+    @classmethod
+    def _start_sdcore_configuration(cls) -> Future:
+        """Configure Charmed SD-Core in the background as soon as NMS is ready.
+
+        The configuration is started only once per test session.
+
+        Returns:
+            Future: Future completed once SD-Core is configured
+        """
+        if cls.sdcore_configuration is None:
+            executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sdcore-configuration")
+            cls.sdcore_configuration = executor.submit(
+                _configure_sdcore_when_nms_ready, cls.sdcore_configuration_cancelled
+            )
+            executor.shutdown(wait=False)
+        return cls.sdcore_configuration
+
+    @classmethod
+    def _stop_sdcore_configuration(cls):
+        """Cancel the background configuration of SD-Core and wait for it to stop.
+
+        A configuration which already failed is logged, as it may explain the failure of the
+        deployment.
+        """
+        if cls.sdcore_configuration is None:
+            return
+        cls.sdcore_configuration_cancelled.set()
+        try:
+            cls.sdcore_configuration.result()
+        except WaitCancelledError:
+            logger.info("Configuration of SD-Core cancelled.")
+        except Exception:
+            logger.exception("Configuration of SD-Core failed:")
+
+    @staticmethod
+    def _deploy_sdcore(tf_client: TerraformClient, upgrade: bool = False):
         """Deploy the SD-Core Terraform module for testing.
 
         SD-Core Terraform module contains:
@@ -115,22 +254,113 @@ class TestSDCoreBundle:
         - cos-lite Terraform module
         - sdcore-router-k8s Terraform module
         - sdcore-gnbsim-k8s Terraform module
+
+        If the Terraform state of a previous deployment exists, only the difference is applied.
+
+        Args:
+            tf_client (TerraformClient): Terraform client of the SD-Core Terraform module
+            upgrade (bool): Re-fetches modules installed by a previous deployment, so the latest
+                revisions are applied
         """
-        self._generate_tfvars_file()
-        tf_client = TerraformClient(work_dir=os.path.join(os.getcwd(), TERRAFORM_DIR))
-        tf_client.init()
+        tf_client.init(upgrade=upgrade)
         tf_client.apply()
 
     @staticmethod
-    def _generate_tfvars_file():
-        """Generate .tfvars file to configure Terraform deployment."""
+    def _get_deployment_fingerprint(tf_client: TerraformClient) -> Optional[str]:
+        """Compute the fingerprint of the current Terraform configuration.
+
+        Args:
+            tf_client (TerraformClient): Terraform client of the SD-Core Terraform module
+
+        Returns:
+            str: Fingerprint or None if it can't be computed, in which case reuse can't be
+                confirmed and Terraform is applied
+        """
+        try:
+            return tf_client.fingerprint()
+        except TerraformError as e:
+            logger.warning("Failed to compute the deployment fingerprint: %s", e)
+            return None
+
+    @staticmethod
+    @timed("check deployment reuse")
+    def _deployment_is_reusable(work_dir: str, fingerprint: str) -> bool:
+        """Check whether the existing deployment can be reused without applying Terraform.
+
+        Deployment is reusable if fingerprints stored for the SD-Core and RAN models match
+        the fingerprint of the current Terraform configuration and all models are Active-Idle.
+
+        Args:
+            work_dir (str): Terraform root module directory of the current test run
+            fingerprint (str): Fingerprint of the current Terraform configuration
+
+        Returns:
+            bool: Whether the existing deployment can be reused
+        """
+        stored_fingerprints = _load_deployment_fingerprints(work_dir)
+        for model_name in (SDCORE_MODEL_NAME, RAN_MODEL_NAME):
+            model_uuid = juju_helper.get_model_uuid(model_name)
+            if not model_uuid or stored_fingerprints.get(model_uuid) != fingerprint:
+                logger.info("Deployment fingerprint of %s does not match.", model_name)
+                return False
+        for model_name in (SDCORE_MODEL_NAME, RAN_MODEL_NAME, COS_MODEL_NAME):
+            if not juju_helper.model_exists(model_name):
+                logger.info("Juju model %s does not exist.", model_name)
+                return False
+            if not juju_helper.juju_model_is_active_idle(model_name):
+                logger.info("Juju model %s is not healthy.", model_name)
+                return False
+        return True
+
+    @staticmethod
+    def _save_deployment_fingerprint(work_dir: str, fingerprint: str):
+        """Store the fingerprint of the applied Terraform configuration with deployed models.
+
+        Fingerprints are keyed by Juju model UUID, so a recreated model never matches.
+
+        Args:
+            work_dir (str): Terraform root module directory of the current test run
+            fingerprint (str): Fingerprint of the applied Terraform configuration
+        """
+        stored_fingerprints = _load_deployment_fingerprints(work_dir)
+        for model_name in (SDCORE_MODEL_NAME, RAN_MODEL_NAME):
+            if model_uuid := juju_helper.get_model_uuid(model_name):
+                stored_fingerprints[model_uuid] = fingerprint
+        fingerprints_path = os.path.join(work_dir, DEPLOYMENT_FINGERPRINTS_FILE)
+        with open(fingerprints_path, mode="w") as fingerprints:
+            json.dump(stored_fingerprints, fingerprints, indent=2)
+
+    def _prepare_terraform_work_dir(self, work_dir: str):
+        """Prepare the Terraform root module directory of the current test run.
+
+        Namespaced test runs get a private copy of the root module, so their Terraform state,
+        lock and variables do not interfere with each other.
+
+        Args:
+            work_dir (str): Terraform root module directory of the current test run
+        """
+        if work_dir != TERRAFORM_DIR:
+            os.makedirs(work_dir, exist_ok=True)
+            for file_name in os.listdir(TERRAFORM_DIR):
+                if file_name.endswith(".tf"):
+                    shutil.copy(os.path.join(TERRAFORM_DIR, file_name), work_dir)
+        self._generate_tfvars_file(work_dir)
+
+    @staticmethod
+    def _generate_tfvars_file(work_dir: str):
+        """Generate .tfvars file to configure Terraform deployment.
+
+        Args:
+            work_dir (str): Terraform root module directory of the current test run
+        """
         jinja2_environment = Environment(loader=FileSystemLoader(f"{TERRAFORM_DIR}/"))
         template = jinja2_environment.get_template(f"{TFVARS_FILE}.j2")
         content = template.render(
             sdcore_model_name=SDCORE_MODEL_NAME,
             ran_model_name=RAN_MODEL_NAME,
+            cos_model_name=COS_MODEL_NAME,
         )
-        with open(f"{TERRAFORM_DIR}/{TFVARS_FILE}", mode="w") as tfvars:
+        with open(f"{work_dir}/{TFVARS_FILE}", mode="w") as tfvars:
             tfvars.write(content)
 
     @staticmethod
@@ -166,8 +396,80 @@ class TestSDCoreBundle:
         return action_output["url"], action_output["admin-password"]
 
 
+def _get_terraform_work_dir() -> str:
+    """Return the Terraform root module directory of the current test run.
+
+    Returns:
+        str: `terraform` for a non-namespaced run, a private directory otherwise
+    """
+    if suffix := get_namespace_suffix():
+        return os.path.join(TERRAFORM_RUNS_DIR, suffix.lstrip("-"))
+    return TERRAFORM_DIR
+
+
+def _is_retryable_http_error(error: BaseException) -> bool:
+    """Return whether an HTTP request failed because of a temporary condition.
+
+    Args:
+        error (BaseException): Error raised by the request
+
+    Returns:
+        bool: True for connection errors, timeouts and server side errors
+    """
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        return error.response.status_code >= 500 or error.response.status_code == 429
+    return False
+
+
+def _load_deployment_fingerprints(work_dir: str) -> Dict[str, str]:
+    """Load deployment fingerprints stored by previous test sessions.
+
+    Args:
+        work_dir (str): Terraform root module directory of the current test run
+
+    Returns:
+        dict: Terraform configuration fingerprints keyed by Juju model UUID
+    """
+    try:
+        with open(os.path.join(work_dir, DEPLOYMENT_FINGERPRINTS_FILE)) as fingerprints:
+            return json.load(fingerprints)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def _configure_sdcore_when_nms_ready(cancelled: threading.Event) -> None:
+    """Wait for the NMS readiness gate, then configure Charmed SD-Core.
+
+    Args:
+        cancelled (threading.Event): Event which, once set, stops waiting for NMS and
+            configuring SD-Core
+    """
+    nms_gate = ReadinessGate(
+        name="nms-credentials",
+        checks=[nms_credentials_available(SDCORE_MODEL_NAME, NMS_CREDENTIALS_LABEL)],
+        prerequisites=[
+            ReadinessGate(
+                name="nms", checks=[applications_active_idle(SDCORE_MODEL_NAME, ["nms"])]
+            )
+        ],
+    )
+    nms_gate.wait(timeout=SESSION_DEADLINE.timeout(900), cancelled=cancelled)
+    username, password = juju_helper.get_nms_credentials(
+        model_name=SDCORE_MODEL_NAME,
+        juju_secret_label=NMS_CREDENTIALS_LABEL,
+    )
+    if not username or not password:
+        raise Exception("NMS credentials not found.")
+    configure_sdcore(username, password, cancelled)
+
+
 @pytest.mark.abort_on_fail
-def configure_sdcore(username: str, password: str) -> None:
+@timed("configure SD-Core", category="nms")
+def configure_sdcore(
+    username: str, password: str, cancelled: Optional[threading.Event] = None
+) -> None:
     """Configure Charmed SD-Core.
 
     Configuration includes:
@@ -178,15 +480,22 @@ def configure_sdcore(username: str, password: str) -> None:
     Args:
         username (str): NMS username
         password (str): NMS password
+        cancelled (threading.Event): Event which, once set, stops waiting for NMS
+
+    Raises:
+        WaitCancelledError: Raised if the configuration is cancelled while waiting
     """
+    cancelled = cancelled or threading.Event()
     nms_ip_address = juju_helper.get_unit_address(
         model_name=SDCORE_MODEL_NAME,
         application_name="nms",
         unit_number=0,
     )
     nms_client = NMS(url=f"https://{nms_ip_address}:5000")
-    nms_client.wait_for_api_to_be_available()
-    nms_client.wait_for_initialized()
+    nms_client.wait_for_api_to_be_available(
+        timeout=SESSION_DEADLINE.timeout(300), cancelled=cancelled
+    )
+    nms_client.wait_for_initialized(timeout=SESSION_DEADLINE.timeout(300), cancelled=cancelled)
     login_response = nms_client.login(username=username, password=password)
     if not login_response or not login_response.token:
         raise Exception("Failed to login to NMS.")
@@ -197,10 +506,36 @@ def configure_sdcore(username: str, password: str) -> None:
     nms_client.create_network_slice(
         name=TEST_NETWORK_SLICE_NAME,
         device_groups=[TEST_DEVICE_GROUP_NAME],
+        gnodeb_name=f"{RAN_MODEL_NAME}-gnbsim-gnbsim",
         token=login_response.token,
     )
     # 60 seconds for the config to propagate
-    time.sleep(60)
+    with span("SD-Core configuration to propagate", category="sleep"):
+        if cancelled.wait(SESSION_DEADLINE.timeout(60)):
+            raise WaitCancelledError(
+                "Waiting for SD-Core configuration to propagate was cancelled!"
+            )
+
+
+@pytest.fixture(autouse=True)
+def collect_diagnostics_on_failure(request):
+    """Collect diagnostics of all SD-Core models when a test fails.
+
+    Runs before the test class teardown, so the models still exist.
+    """
+    yield
+    report = getattr(request.node, "rep_call", None)
+    if not report or not report.failed:
+        return
+    archive_name = f"sdcore-diagnostics{get_namespace_suffix()}-{time.strftime('%Y%m%d-%H%M%S')}"
+    try:
+        collect_diagnostics(
+            model_names=(SDCORE_MODEL_NAME, RAN_MODEL_NAME, COS_MODEL_NAME),
+            archive_path=os.path.join(DIAGNOSTICS_DIR, f"{archive_name}.tar.gz"),
+            time_budget=DIAGNOSTICS_TIME_BUDGET,
+        )
+    except Exception as e:
+        logger.warning("Failed to collect diagnostics: %s", e)
 
 
 @pytest.fixture(scope="module")